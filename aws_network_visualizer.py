@@ -1,19 +1,217 @@
-import boto3
-from botocore.exceptions import ClientError
-import networkx as nx
-from pyvis.network import Network
+# boto3, botocore and pyvis are imported where they're used, since importing
+# them takes far longer than the rest of a --help or cache-hit run
 import sys
 import os
 import base64
+import copy
+import functools
+import gzip
+import hashlib
+import shutil
+import json
+import tempfile
+import time
+import argparse
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
-def get_aws_client(service_name):
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Adaptive retries back off on throttling from the parallel describe calls, the
+# pool is large enough that those calls never wait for a free connection, and
+# TCP keep-alive stops idle pooled connections being dropped between pages
+CLIENT_CONFIG = dict(retries={'mode': 'adaptive', 'max_attempts': 10}, max_pool_connections=16,
+                     tcp_keepalive=True, user_agent_extra='aws-network-visualizer')
+# Cap on describe calls in flight at once, to stay clear of EC2's API rate limits
+MAX_CONCURRENT_REQUESTS = 4
+
+ICON_PATHS = {
+    'vpc': 'icons/vpc-icon.png',
+    'subnet_public': 'icons/subnet-public-icon.png',
+    'subnet_private': 'icons/subnet-private-icon.png',
+    'route_table': 'icons/route-table-icon.png',
+    'nacl': 'icons/nacl-icon.png',
+    'eni': 'icons/eni-icon.png',
+    'endpoint': 'icons/endpoint-icon.png'
+}
+
+GROUP_COLORS = {
+    'vpc': '#FF9900',
+    'subnet_public': '#1EC9E8',
+    'subnet_private': '#A4D4FF',
+    'route_table': '#FF5252',
+    'nacl': '#7B35BA',
+    'eni': '#9CCC65',
+    'endpoint': '#FB8C00'
+}
+
+# Row of each node group in the hierarchical layout used for large graphs
+GROUP_LEVELS = {
+    'vpc': 0,
+    'route_table': 1,
+    'nacl': 1,
+    'endpoint': 1,
+    'subnet_public': 2,
+    'subnet_private': 2,
+    'eni': 3
+}
+
+# Above this many nodes the browser's force simulation takes seconds to
+# settle, so a hierarchical layout without physics is used instead
+LARGE_GRAPH_NODES = 500
+
+PYVIS_OPTIONS = {
+    "nodes": {
+        "borderWidth": 2,
+        "borderWidthSelected": 4,
+        "color": {
+            "border": "#222222",
+            "background": "#ffffff"
+        },
+        "font": {"color": "#ffffff", "size": 12},
+        "label": "label"
+    },
+    "edges": {
+        "color": {"inherit": True},
+        "smooth": False
+    },
+    "physics": {
+        "barnesHut": {
+            "gravitationalConstant": -2000,
+            "centralGravity": 0.3,
+            "springLength": 95,
+            "springConstant": 0.04,
+            "damping": 0.09,
+            "avoidOverlap": 0.1
+        },
+        "maxVelocity": 50,
+        "minVelocity": 0.1,
+        "solver": "barnesHut",
+        "stabilization": {
+            "enabled": True,
+            "iterations": 1000,
+            "updateInterval": 100,
+            "onlyDynamicEdges": False,
+            "fit": True
+        },
+        "timestep": 0.5,
+        "adaptiveTimestep": True
+    }
+}
+
+CACHE_DIR = os.path.expanduser('~/.cache/aws_net_viz')
+CACHE_TTL = 600
+# Opt in to orjson for the cache (de)serialization with USE_ORJSON=1
+USE_ORJSON = orjson is not None and os.environ.get('USE_ORJSON') == '1'
+# Bump whenever the cached record layout changes
+CACHE_VERSION = 2
+
+# Each describe response is projected onto one of these records as its pages
+# arrive, keeping only the fields create_graph uses, so the much larger boto3
+# dicts are freed straight away
+Vpc = namedtuple('Vpc', ['id', 'name', 'cidr'])
+Subnet = namedtuple('Subnet', ['id', 'vpc_id', 'name', 'cidr'])
+RouteTable = namedtuple('RouteTable', ['id', 'vpc_id', 'name', 'is_main', 'has_igw', 'subnet_ids', 'routes'])
+NetworkAcl = namedtuple('NetworkAcl', ['id', 'vpc_id', 'name', 'subnet_ids'])
+NetworkInterface = namedtuple('NetworkInterface', ['id', 'subnet_id', 'name', 'private_ip'])
+VpcEndpoint = namedtuple('VpcEndpoint', ['id', 'vpc_id', 'name', 'type', 'subnet_ids'])
+
+RECORD_TYPES = {
+    "vpcs": Vpc,
+    "subnets": Subnet,
+    "route_tables": RouteTable,
+    "network_acls": NetworkAcl,
+    "network_interfaces": NetworkInterface,
+    "vpc_endpoints": VpcEndpoint
+}
+
+@functools.lru_cache(maxsize=None)
+def get_session():
+    import boto3
+    return boto3.session.Session()
+
+@functools.lru_cache(maxsize=None)
+def get_aws_client(service_name, region_name=None):
+    from botocore.config import Config
     try:
-        return boto3.client(service_name)
+        return get_session().client(service_name, region_name=region_name, config=Config(**CLIENT_CONFIG))
     except Exception as e:
         print(f"Error creating {service_name} client: {str(e)}", file=sys.stderr)
         return None
 
-def get_network_topology():
+def get_resource_name(resource, key='Tags'):
+    return next((tag['Value'] for tag in resource.get(key, ()) if tag['Key'] == 'Name'), None)
+
+def format_route(route):
+    destination = route.get('DestinationCidrBlock') or route.get('DestinationPrefixListId') or 'N/A'
+    target = route.get('GatewayId') or route.get('NatGatewayId') or route.get('NetworkInterfaceId') or 'N/A'
+    return f"Destination: {destination}, Target: {target}"
+
+def to_vpc(vpc):
+    vpc_id = vpc['VpcId']
+    return Vpc(vpc_id, get_resource_name(vpc) or vpc_id, vpc['CidrBlock'])
+
+def to_subnet(subnet):
+    subnet_id = subnet['SubnetId']
+    return Subnet(subnet_id, subnet['VpcId'], get_resource_name(subnet) or subnet_id, subnet['CidrBlock'])
+
+def to_route_table(rt):
+    rt_id = rt['RouteTableId']
+    is_main = False
+    subnet_ids = []
+    for assoc in rt.get('Associations') or ():
+        if assoc.get('Main'):
+            is_main = True
+        subnet_id = assoc.get('SubnetId')
+        if subnet_id:
+            subnet_ids.append(subnet_id)
+    routes = rt.get('Routes') or ()
+    has_igw = any(route.get('GatewayId', '').startswith('igw-') for route in routes)
+    return RouteTable(rt_id, rt['VpcId'], get_resource_name(rt) or rt_id, is_main, has_igw,
+                      tuple(subnet_ids), tuple(map(format_route, routes)))
+
+def to_network_acl(nacl):
+    nacl_id = nacl['NetworkAclId']
+    subnet_ids = tuple(assoc['SubnetId'] for assoc in nacl.get('Associations') or () if 'SubnetId' in assoc)
+    return NetworkAcl(nacl_id, nacl['VpcId'], get_resource_name(nacl) or nacl_id, subnet_ids)
+
+def to_network_interface(eni):
+    eni_id = eni['NetworkInterfaceId']
+    return NetworkInterface(eni_id, eni['SubnetId'], get_resource_name(eni, key='TagSet') or eni_id, eni['PrivateIpAddress'])
+
+def to_vpc_endpoint(endpoint):
+    endpoint_id = endpoint['VpcEndpointId']
+    return VpcEndpoint(endpoint_id, endpoint['VpcId'], get_resource_name(endpoint) or endpoint_id,
+                       endpoint['VpcEndpointType'], tuple(endpoint.get('SubnetIds') or ()))
+
+def list_all(client, operation, key, page_size, filters=(), project=None):
+    kwargs = {'Filters': list(filters)} if filters else {}
+    pages = client.get_paginator(operation).paginate(PaginationConfig={'PageSize': page_size}, **kwargs)
+    items = []
+    retries = 0
+    for page in pages:
+        page_items = page.get(key, [])
+        items.extend(map(project, page_items) if project else page_items)
+        retries += page.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+    # Retries almost always mean EC2 is throttling the describe calls
+    if retries:
+        print(f"Warning: {operation} was retried {retries} time(s), likely due to API throttling", file=sys.stderr)
+    return items
+
+# filters maps EC2 filter names ('vpc-id', 'availability-zone') to the values
+# to keep. Each is only sent to the describe calls that support it, so the
+# filtering happens server-side instead of after downloading everything.
+def get_network_topology(region_name=None, filters=None):
+    return fetch_topology(region_name, filters)[0]
+
+# Returns the topology along with whether every describe call succeeded
+def fetch_topology(region_name=None, filters=None):
+    from botocore.exceptions import ClientError
+
     topology = {
         "vpcs": [],
         "subnets": [],
@@ -23,202 +221,325 @@ def get_network_topology():
         "vpc_endpoints": []
     }
 
-    ec2_client = get_aws_client('ec2')
+    ec2_client = get_aws_client('ec2', region_name)
     if not ec2_client:
-        return topology
+        return topology, False
+
+    # (paginated operation, response key, largest page size the API accepts, supported filters, projection)
+    calls = {
+        "vpcs": ("describe_vpcs", "Vpcs", 1000, ('vpc-id',), to_vpc),
+        "subnets": ("describe_subnets", "Subnets", 1000, ('vpc-id', 'availability-zone'), to_subnet),
+        "route_tables": ("describe_route_tables", "RouteTables", 100, ('vpc-id',), to_route_table),
+        "network_acls": ("describe_network_acls", "NetworkAcls", 1000, ('vpc-id',), to_network_acl),
+        "network_interfaces": ("describe_network_interfaces", "NetworkInterfaces", 1000,
+                               ('vpc-id', 'availability-zone'), to_network_interface),
+        "vpc_endpoints": ("describe_vpc_endpoints", "VpcEndpoints", 1000, ('vpc-id',), to_vpc_endpoint)
+    }
+
+    filters = filters or {}
+    # boto3 clients are thread-safe, so all describe calls share the one client
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        futures = {}
+        for name, (operation, key, page_size, supported_filters, project) in calls.items():
+            call_filters = [{'Name': f, 'Values': filters[f]} for f in supported_filters if filters.get(f)]
+            futures[name] = executor.submit(list_all, ec2_client, operation, key, page_size, call_filters, project)
+
+    complete = True
+    for name, future in futures.items():
+        try:
+            topology[name] = future.result()
+        except ClientError as e:
+            print(f"Error fetching {name}: {e}", file=sys.stderr)
+            complete = False
+
+    return topology, complete
 
+@functools.lru_cache(maxsize=None)
+def get_account_id(region_name=None):
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    sts_client = get_aws_client('sts', region_name)
+    if not sts_client:
+        return None
     try:
-        topology["vpcs"] = ec2_client.describe_vpcs().get("Vpcs", [])
-        topology["subnets"] = ec2_client.describe_subnets().get("Subnets", [])
-        topology["route_tables"] = ec2_client.describe_route_tables().get("RouteTables", [])
-        topology["network_acls"] = ec2_client.describe_network_acls().get("NetworkAcls", [])
-        topology["network_interfaces"] = ec2_client.describe_network_interfaces().get("NetworkInterfaces", [])
-        topology["vpc_endpoints"] = ec2_client.describe_vpc_endpoints().get("VpcEndpoints", [])
-    except ClientError as e:
-        print(f"Error fetching network data: {e}", file=sys.stderr)
+        return sts_client.get_caller_identity()['Account']
+    except (BotoCoreError, ClientError) as e:
+        print(f"Error fetching account ID: {e}", file=sys.stderr)
+        return None
 
+def load_topology_cached(ttl=CACHE_TTL, region_name=None, filters=None, cache_dir=CACHE_DIR):
+    account_id = get_account_id(region_name)
+    ec2_client = get_aws_client('ec2', region_name)
+    if not account_id or not ec2_client:
+        return get_network_topology(region_name, filters)
+
+    cache_key = f"{account_id}_{ec2_client.meta.region_name}"
+    if filters:
+        filters_json = json.dumps(filters, sort_keys=True).encode('utf-8')
+        cache_key += f"_{hashlib.blake2b(filters_json, digest_size=8).hexdigest()}"
+    cache_path = os.path.join(cache_dir, f"{cache_key}.v{CACHE_VERSION}.json.gz")
+    try:
+        if os.path.getmtime(cache_path) > time.time() - ttl:
+            with open(cache_path, "rb") as cache_file:
+                cached = load_json(gzip.decompress(cache_file.read()))
+            # Records are stored as plain JSON arrays
+            return {name: [RECORD_TYPES[name]._make(row) for row in rows] for name, rows in cached.items()}
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    topology, complete = fetch_topology(region_name, filters)
+    # Don't let a partial fetch be served from the cache on later runs
+    if complete:
+        try:
+            save_topology_cache(topology, cache_path)
+        except OSError as e:
+            print(f"Error writing topology cache: {e}", file=sys.stderr)
     return topology
 
-def create_graph(topology):
-    G = nx.Graph()
+def dump_json(obj):
+    # orjson doesn't serialize tuple subclasses, i.e. the record types
+    if USE_ORJSON:
+        return orjson.dumps(obj, default=tuple)
+    return json.dumps(obj).encode('utf-8')
 
-    icon_paths = {
-        'vpc': 'icons/vpc-icon.png',
-        'subnet_public': 'icons/subnet-public-icon.png',
-        'subnet_private': 'icons/subnet-private-icon.png',
-        'route_table': 'icons/route-table-icon.png',
-        'nacl': 'icons/nacl-icon.png',
-        'eni': 'icons/eni-icon.png',
-        'endpoint': 'icons/endpoint-icon.png'
-    }
+def load_json(data):
+    return orjson.loads(data) if USE_ORJSON else json.loads(data)
 
-    def get_base64_encoded_image(image_path):
-        with open(image_path, "rb") as image_file:
-            return f"data:image/png;base64,{base64.b64encode(image_file.read()).decode('utf-8')}"
+def save_topology_cache(topology, cache_path):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path))
+    try:
+        with os.fdopen(fd, "wb") as cache_file:
+            cache_file.write(gzip.compress(dump_json(topology)))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        os.unlink(tmp_path)
+        raise
 
-    def get_resource_name(resource, key='Tags'):
-        tags = resource.get(key, [])
-        for tag in tags:
-            if tag['Key'] == 'Name':
-                return tag['Value']
-        return None
+@functools.lru_cache(maxsize=None)
+def get_base64_encoded_image(image_path):
+    with open(image_path, "rb") as image_file:
+        return f"data:image/png;base64,{base64.b64encode(image_file.read()).decode('utf-8')}"
+
+# Encoded once at import; left empty if the icons aren't reachable from the
+# current directory, which the entry point reports
+try:
+    ICONS_B64 = {group: get_base64_encoded_image(path) for group, path in ICON_PATHS.items()}
+except OSError:
+    ICONS_B64 = {}
 
-    # Identify public subnets
+def get_relative_image_url(image_path, html_dir):
+    return Path(os.path.relpath(os.path.abspath(image_path), html_dir)).as_posix()
+
+# With link_icons_from set to the directory the HTML is written to, nodes
+# reference the icon files relative to it instead of embedding a copy of the
+# icon in every node, which keeps the output small for large topologies
+def create_graph(topology, link_icons_from=None):
+    # Resolve each group's appearance once rather than once per node. The
+    # attributes are set directly instead of via 'group', since pyvis ignores
+    # a node's color whenever it has a group.
+    if link_icons_from is None:
+        images = ICONS_B64 or {group: get_base64_encoded_image(path) for group, path in ICON_PATHS.items()}
+    else:
+        images = {group: get_relative_image_url(path, link_icons_from) for group, path in ICON_PATHS.items()}
+    styles = {group: dict(image=images[group], color=GROUP_COLORS[group], shape='image', level=GROUP_LEVELS[group])
+              for group in ICON_PATHS}
+
+    # The graph is a list of (node_id, attributes) and a list of (u, v) edges,
+    # handed straight to pyvis by visualize_graph
+    nodes = []
+    edges = []
+
+    # A single pass over the route tables both identifies public subnets and
+    # emits the route table nodes and edges
     public_subnets = set()
-    main_route_tables = {}
+    # VPCs whose main route table has an internet gateway route
+    vpc_main_igw = set()
     for rt in topology['route_tables']:
-        vpc_id = rt['VpcId']
-        is_main = any(assoc.get('Main', False) for assoc in rt.get('Associations', []))
-        has_igw = any(route.get('GatewayId', '').startswith('igw-') for route in rt.get('Routes', []))
-        
-        if is_main:
-            main_route_tables[vpc_id] = {'route_table_id': rt['RouteTableId'], 'has_igw': has_igw}
-        
-        if has_igw:
-            for assoc in rt.get('Associations', []):
-                if 'SubnetId' in assoc:
-                    public_subnets.add(assoc['SubnetId'])
+        if rt.is_main:
+            if rt.has_igw:
+                vpc_main_igw.add(rt.vpc_id)
+            edges.append((rt.id, rt.vpc_id))
+
+        if rt.has_igw:
+            public_subnets.update(rt.subnet_ids)
+
+        routes = "\n".join(rt.routes)
+        nodes.append((rt.id, dict(title=f"Route Table: {rt.name}\nID: {rt.id}\nRoutes:\n{routes}",
+                                  **styles['route_table'], size=20, label=rt.name)))
+        edges.extend((rt.id, subnet_id) for subnet_id in rt.subnet_ids)
 
     for vpc in topology['vpcs']:
-        vpc_id = vpc['VpcId']
-        vpc_name = get_resource_name(vpc) or vpc_id
-        G.add_node(vpc_id, title=f"VPC: {vpc_name}\nID: {vpc_id}\nCIDR: {vpc['CidrBlock']}", 
-                   group='vpc', image=get_base64_encoded_image(icon_paths['vpc']), size=25, label=vpc_name)
+        nodes.append((vpc.id, dict(title=f"VPC: {vpc.name}\nID: {vpc.id}\nCIDR: {vpc.cidr}",
+                                   **styles['vpc'], size=25, label=vpc.name)))
+
+    # Accounts with no internet gateway routes at all skip the per-subnet checks
+    any_public = bool(public_subnets or vpc_main_igw)
 
     for subnet in topology['subnets']:
-        subnet_id = subnet['SubnetId']
-        vpc_id = subnet['VpcId']
-        subnet_name = get_resource_name(subnet) or subnet_id
-        
         # Check if subnet is public (either by specific route table or VPC's main route table)
-        is_public = subnet_id in public_subnets or (vpc_id in main_route_tables and main_route_tables[vpc_id]['has_igw'])
-        
-        subnet_type = 'subnet_public' if is_public else 'subnet_private'
-        G.add_node(subnet_id, title=f"Subnet: {subnet_name}\nID: {subnet_id}\nCIDR: {subnet['CidrBlock']}\nType: {'Public' if is_public else 'Private'}", 
-                   group=subnet_type, image=get_base64_encoded_image(icon_paths[subnet_type]), size=25, label=subnet_name)
-        G.add_edge(vpc_id, subnet_id)
+        is_public = any_public and (subnet.id in public_subnets or subnet.vpc_id in vpc_main_igw)
 
-    for rt in topology['route_tables']:
-        rt_id = rt['RouteTableId']
-        vpc_id = rt['VpcId']
-        rt_name = get_resource_name(rt) or rt_id
-        routes = "\n".join([f"Destination: {r.get('DestinationCidrBlock', 'N/A')}, Target: {r.get('GatewayId', r.get('NatGatewayId', r.get('NetworkInterfaceId', 'N/A')))}" for r in rt['Routes']])
-        G.add_node(rt_id, title=f"Route Table: {rt_name}\nID: {rt_id}\nRoutes:\n{routes}", 
-                   group='route_table', image=get_base64_encoded_image(icon_paths['route_table']), size=20, label=rt_name)
-        
-        is_main = any(assoc.get('Main', False) for assoc in rt.get('Associations', []))
-        if is_main:
-            G.add_edge(rt_id, vpc_id)
-        for assoc in rt.get('Associations', []):
-            if 'SubnetId' in assoc:
-                G.add_edge(rt_id, assoc['SubnetId'])
+        subnet_type = 'subnet_public' if is_public else 'subnet_private'
+        nodes.append((subnet.id, dict(title=f"Subnet: {subnet.name}\nID: {subnet.id}\nCIDR: {subnet.cidr}\nType: {'Public' if is_public else 'Private'}",
+                                      **styles[subnet_type], size=25, label=subnet.name)))
+        edges.append((subnet.vpc_id, subnet.id))
 
     for nacl in topology['network_acls']:
-        nacl_id = nacl['NetworkAclId']
-        vpc_id = nacl['VpcId']
-        nacl_name = get_resource_name(nacl) or nacl_id
-        G.add_node(nacl_id, title=f"Network ACL: {nacl_name}\nID: {nacl_id}", 
-                   group='nacl', image=get_base64_encoded_image(icon_paths['nacl']), size=20, label=nacl_name)
-        G.add_edge(vpc_id, nacl_id)
-        for assoc in nacl.get('Associations', []):
-            if 'SubnetId' in assoc:
-                G.add_edge(nacl_id, assoc['SubnetId'])
+        nodes.append((nacl.id, dict(title=f"Network ACL: {nacl.name}\nID: {nacl.id}",
+                                    **styles['nacl'], size=20, label=nacl.name)))
+        edges.append((nacl.vpc_id, nacl.id))
+        edges.extend((nacl.id, subnet_id) for subnet_id in nacl.subnet_ids)
 
     for eni in topology['network_interfaces']:
-        eni_id = eni['NetworkInterfaceId']
-        subnet_id = eni['SubnetId']
-        eni_name = get_resource_name(eni, key='TagSet') or eni_id
-        G.add_node(eni_id, title=f"ENI: {eni_name}\nID: {eni_id}\nPrivate IP: {eni['PrivateIpAddress']}", 
-                   group='eni', image=get_base64_encoded_image(icon_paths['eni']), size=20, label=eni_name)
-        G.add_edge(subnet_id, eni_id)
+        nodes.append((eni.id, dict(title=f"ENI: {eni.name}\nID: {eni.id}\nPrivate IP: {eni.private_ip}",
+                                   **styles['eni'], size=20, label=eni.name)))
+        edges.append((eni.subnet_id, eni.id))
 
     for endpoint in topology['vpc_endpoints']:
-        endpoint_id = endpoint['VpcEndpointId']
-        vpc_id = endpoint['VpcId']
-        endpoint_name = get_resource_name(endpoint) or endpoint_id
-        G.add_node(endpoint_id, title=f"VPC Endpoint: {endpoint_name}\nID: {endpoint_id}\nType: {endpoint['VpcEndpointType']}", 
-                   group='endpoint', image=get_base64_encoded_image(icon_paths['endpoint']), size=20, label=endpoint_name)
-        G.add_edge(vpc_id, endpoint_id)
-        if 'SubnetIds' in endpoint:
-            for subnet_id in endpoint['SubnetIds']:
-                G.add_edge(endpoint_id, subnet_id)
-
-    return G
-
-def visualize_graph(G, output_file):
-    net = Network(height="750px", width="100%", bgcolor="#222222", font_color="white")
-    net.from_nx(G)
-
-    # Customize node appearances
-    group_colors = {
-        'vpc': '#FF9900',
-        'subnet_public': '#1EC9E8',
-        'subnet_private': '#A4D4FF',
-        'route_table': '#FF5252',
-        'nacl': '#7B35BA',
-        'eni': '#9CCC65',
-        'endpoint': '#FB8C00'
-    }
+        nodes.append((endpoint.id, dict(title=f"VPC Endpoint: {endpoint.name}\nID: {endpoint.id}\nType: {endpoint.type}",
+                                        **styles['endpoint'], size=20, label=endpoint.name)))
+        edges.append((endpoint.vpc_id, endpoint.id))
+        edges.extend((endpoint.id, subnet_id) for subnet_id in endpoint.subnet_ids)
 
-    for node in net.nodes:
-        node['color'] = group_colors.get(node['group'], '#FFFFFF')
-        node['shape'] = 'image'
+    return nodes, edges
 
-    net.set_options("""
-    var options = {
-      "nodes": {
-        "borderWidth": 2,
-        "borderWidthSelected": 4,
-        "color": {
-          "border": "#222222",
-          "background": "#ffffff"
-        },
-        "font": {"color": "#ffffff", "size": 12},
-        "label": "label"
-      },
-      "edges": {
-        "color": {"inherit": true},
-        "smooth": false
-      },
-      "physics": {
-        "barnesHut": {
-          "gravitationalConstant": -2000,
-          "centralGravity": 0.3,
-          "springLength": 95,
-          "springConstant": 0.04,
-          "damping": 0.09,
-          "avoidOverlap": 0.1
-        },
-        "maxVelocity": 50,
-        "minVelocity": 0.1,
-        "solver": "barnesHut",
-        "stabilization": {
-          "enabled": true,
-          "iterations": 1000,
-          "updateInterval": 100,
-          "onlyDynamicEdges": false,
-          "fit": true
-        },
-        "timestep": 0.5,
-        "adaptiveTimestep": true
-      }
-    }
-    """)
+# Lays the graph out up front so the browser doesn't have to run its physics
+# simulation, which stalls on large graphs. Needs the optional networkx
+# dependency, plus scipy for graphs of 500+ nodes.
+def compute_layout(graph):
+    import networkx as nx
+
+    nodes, edges = graph
+    G = nx.Graph()
+    G.add_nodes_from(node_id for node_id, _ in nodes)
+    G.add_edges_from((u, v) for u, v in edges if u in G and v in G)
+    positions = nx.spring_layout(G, seed=0)
+    # Spread the nodes out in proportion to the graph's size, in pixels
+    return nx.rescale_layout_dict(positions, scale=100 * max(len(G), 1) ** 0.5)
+
+# Renders the laid-out graph to a static SVG. Needs the optional networkx and
+# matplotlib dependencies.
+def write_static_svg(graph, positions, svg_file):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
+    nodes, edges = graph
+    G = nx.Graph()
+    G.add_nodes_from(nodes)
+    G.add_edges_from((u, v) for u, v in edges if u in G and v in G)
+
+    side = max(8, len(G) ** 0.5)
+    fig, ax = plt.subplots(figsize=(side, side))
+    nx.draw_networkx(G, pos=positions, ax=ax, node_size=[G.nodes[n]['size'] * 8 for n in G],
+                     node_color=[G.nodes[n]['color'] for n in G],
+                     labels={n: G.nodes[n]['label'] for n in G}, font_size=6, edge_color='#888888')
+    ax.set_axis_off()
+    fig.savefig(svg_file, format='svg', bbox_inches='tight')
+    plt.close(fig)
+
+# Returns the path actually written, which gains a .gz suffix when compressing.
+# With positions, nodes are placed at them and the browser's physics is off.
+def visualize_graph(graph, output_file, compress=False, inline_js=False, positions=None):
+    from pyvis.network import Network
+
+    nodes, edges = graph
+    # By default the page loads the minified vis-network build from a CDN, so
+    # browsers cache it across topology views; inline_js embeds it instead
+    # for machines without internet access
+    net = Network(height="750px", width="100%", bgcolor="#222222", font_color="white",
+                  cdn_resources="in_line" if inline_js else "remote")
+
+    # pyvis checks node ids by scanning plain lists on every insert, so give
+    # it small integers rather than long AWS ID strings; the AWS IDs stay
+    # visible in each node's label and title
+    node_index = {}
+    for node_id, attrs in nodes:
+        if node_id in node_index:
+            continue
+        node_index[node_id] = len(node_index)
+        if positions:
+            x, y = positions[node_id]
+            # vis-network's y axis points down, matplotlib's up
+            attrs = dict(attrs, x=float(x), y=float(-y))
+        net.add_node(node_index[node_id], **attrs)
+
+    # pyvis rejects edges to unknown nodes, so skip references to resources
+    # that weren't fetched (e.g. subnets outside an --az filter)
+    for source, target in edges:
+        if source in node_index and target in node_index:
+            net.add_edge(node_index[source], node_index[target])
+
+    options = copy.deepcopy(PYVIS_OPTIONS)
+    # Small graphs settle long before 1000 iterations, which the browser
+    # would otherwise still spend simulating
+    options['physics']['stabilization']['iterations'] = min(1000, max(100, 4 * len(node_index)))
+    if positions:
+        options['physics']['enabled'] = False
+    elif len(node_index) > LARGE_GRAPH_NODES:
+        options['physics']['enabled'] = False
+        options['layout'] = {'hierarchical': {'enabled': True, 'direction': 'UD'}}
+    net.set_options(dump_json(options).decode('utf-8'))
 
     net.save_graph(output_file)
 
+    if compress:
+        with open(output_file, "rb") as html_file, gzip.open(output_file + ".gz", "wb", compresslevel=6) as gz_file:
+            shutil.copyfileobj(html_file, gz_file)
+        os.remove(output_file)
+        return output_file + ".gz"
+    return output_file
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python aws_network_topology_visualizer.py <output_html_file>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Visualize your AWS network topology as an interactive HTML graph.")
+    parser.add_argument("output_file", help="path of the HTML file to write")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"always fetch from AWS instead of reusing a topology fetched in the last {CACHE_TTL} seconds")
+    parser.add_argument("--cache-dir", default=CACHE_DIR,
+                        help=f"directory to keep cached topologies in (default: {CACHE_DIR})")
+    parser.add_argument("--link-icons", action="store_true",
+                        help="reference the icon files from the HTML instead of embedding them; "
+                             "the icons directory must stay reachable from the HTML file")
+    parser.add_argument("--region", help="AWS region to visualize (defaults to your configured region)")
+    parser.add_argument("--vpc-id", action="append", help="only include this VPC; may be repeated")
+    parser.add_argument("--az", action="append",
+                        help="only include subnets and network interfaces in this availability zone; may be repeated")
+    parser.add_argument("--gzip", action="store_true",
+                        help="write a gzip-compressed <output_file>.gz instead of the plain HTML")
+    parser.add_argument("--inline-js", action="store_true",
+                        help="embed the vis-network JavaScript in the HTML so it works offline")
+    parser.add_argument("--static-svg", action="store_true",
+                        help="lay the graph out ahead of time, also write it as a static SVG next to the HTML, "
+                             "and turn off in-browser physics (requires networkx, scipy and matplotlib)")
+    args = parser.parse_args()
 
-    output_file = sys.argv[1]
+    output_file = args.output_file
 
     if not os.path.exists('icons'):
         print("Error: 'icons' directory not found. Please create it and add the necessary PNG icons.")
         sys.exit(1)
 
-    topology = get_network_topology()
-    G = create_graph(topology)
-    visualize_graph(G, output_file)
-    print(f"Graph visualization saved to {output_file}")
+    filters = {'vpc-id': args.vpc_id, 'availability-zone': args.az}
+    filters = {name: values for name, values in filters.items() if values}
+    if args.no_cache:
+        topology = get_network_topology(args.region, filters)
+    else:
+        topology = load_topology_cached(region_name=args.region, filters=filters, cache_dir=args.cache_dir)
+    link_icons_from = os.path.dirname(os.path.abspath(output_file)) if args.link_icons else None
+    graph = create_graph(topology, link_icons_from)
+
+    positions = None
+    if args.static_svg:
+        svg_file = os.path.splitext(output_file)[0] + ".svg"
+        try:
+            positions = compute_layout(graph)
+            write_static_svg(graph, positions, svg_file)
+        except ImportError as e:
+            print(f"Error: --static-svg requires networkx, scipy and matplotlib ({e})", file=sys.stderr)
+            sys.exit(1)
+        print(f"Static SVG saved to {svg_file}")
+
+    saved_file = visualize_graph(graph, output_file, compress=args.gzip, inline_js=args.inline_js, positions=positions)
+    print(f"Graph visualization saved to {saved_file}")
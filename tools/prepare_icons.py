@@ -0,0 +1,39 @@
+# Shrinks the icons in icons/ in place so the base64 copies embedded in the
+# generated HTML stay small: each icon is downscaled to fit the largest size
+# a node is drawn at and re-saved as an optimized palette PNG.
+#
+# Requires Pillow, which the visualizer itself doesn't need:
+#   pip install Pillow
+#   python tools/prepare_icons.py
+import argparse
+import glob
+import os
+import sys
+
+from PIL import Image
+
+def prepare_icon(path, max_size, colors):
+    with Image.open(path) as img:
+        img = img.convert('RGBA')
+        img.thumbnail((max_size, max_size), Image.LANCZOS)
+        # quantize keeps the alpha channel, unlike convert('P', palette=ADAPTIVE)
+        img = img.quantize(colors=colors, method=Image.FASTOCTREE)
+    img.save(path, optimize=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Downscale and palette-quantize the visualizer's PNG icons in place.")
+    parser.add_argument("--icons-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'icons'))
+    # Nodes are drawn at most 50px across (size=25), so larger icons only add bytes
+    parser.add_argument("--max-size", type=int, default=50)
+    parser.add_argument("--colors", type=int, default=64)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.icons_dir, '*.png')))
+    if not paths:
+        print(f"Error: no PNG icons found in {args.icons_dir}", file=sys.stderr)
+        sys.exit(1)
+
+    for path in paths:
+        before = os.path.getsize(path)
+        prepare_icon(path, args.max_size, args.colors)
+        print(f"{os.path.basename(path)}: {before} -> {os.path.getsize(path)} bytes")